@@ -1,61 +1,226 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
 import base64
+import functools
+import html
 import math
 import os
+import queue
 import re
+import shutil
+import subprocess
 import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
 from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
 
 from pypdf import PdfReader, PdfWriter
+try:
+    import pikepdf  # qpdf-backed; much faster merges than pure-Python pypdf
+except ImportError:
+    pikepdf = None
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.download_manager import WDMDownloadManager
+from webdriver_manager.core.http import WDMHttpClient
+import requests
+from requests.adapters import HTTPAdapter
 import random
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
 
 SAFE = re.compile(r"[^a-zA-Z0-9._-]+")
 
+# (1-based index, url, output pdf path)
+Job = Tuple[int, str, Path]
+# Called as each job finishes: (output pdf path, succeeded)
+OnDone = Callable[[Path, bool], None]
+
 def safe_name(url: str) -> str:
     base = url.strip().split("://")[-1]
     base = base[:150]
     return SAFE.sub("_", base) or "page"
 
-def merge_pdfs(inputs: List[Path], output: Path):
+@functools.lru_cache(maxsize=None)
+def _open_reader(path: str) -> PdfReader:
+    # Parsing dominates merge cost; never parse the same source twice.
+    return PdfReader(path)
+
+def merge_pdfs(inputs: List[Path], output: Path, merger: str = "auto"):
+    if merger == "auto":
+        merger = "pikepdf" if pikepdf is not None else "pypdf"
+    if merger == "pikepdf":
+        if pikepdf is None:
+            raise RuntimeError("--merger pikepdf requires: pip install pikepdf")
+        pdf = pikepdf.Pdf.new()
+        # Copied pages read stream data lazily, so sources must stay open until save.
+        sources = [pikepdf.open(p) for p in inputs]
+        try:
+            for src in sources:
+                pdf.pages.extend(src.pages)
+            # Inputs are small and already compressed; skip recompression work
+            pdf.save(str(output), linearize=False, compress_streams=False)
+        finally:
+            for src in sources:
+                src.close()
+        return
+    if merger == "pdftk":
+        subprocess.run(["pdftk", *map(str, inputs), "cat", "output", str(output)], check=True)
+        return
+
     writer = PdfWriter()
-    for p in inputs:
-        reader = PdfReader(str(p))
-        for page in reader.pages:
-            writer.add_page(page)
-    with open(output, "wb") as f:
-        writer.write(f)
+    try:
+        for p in inputs:
+            reader = _open_reader(str(p))
+            print(f"  + {Path(p).name}: {len(reader.pages)} page(s)")
+            writer.append(reader)
+        with open(output, "wb") as f:
+            writer.write(f)
+    finally:
+        _open_reader.cache_clear()
+
+def merge_tree(inputs: List[Path], output: Path, k: int = 32, merger: str = "auto"):
+    """
+    Merge in groups of k, then merge the intermediates, so no single writer
+    has to hold every page at once.
+    """
+    k = max(2, k)
+    if len(inputs) <= k:
+        merge_pdfs(inputs, output, merger=merger)
+        return
+    if merger == "auto":
+        merger = "pikepdf" if pikepdf is not None else "pypdf"
+    groups = [inputs[i:i + k] for i in range(0, len(inputs), k)]
+    with tempfile.TemporaryDirectory(prefix="scholar_merge_") as tmp:
+        parts = [Path(tmp) / f"tmp_{i:04d}.pdf" for i in range(len(groups))]
+        # pikepdf/pdftk do their work outside the GIL; pypdf gains nothing from threads
+        workers = 1 if merger == "pypdf" else min(len(groups), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda gp: merge_pdfs(gp[0], gp[1], merger=merger), zip(groups, parts)))
+        merge_tree(parts, output, k=k, merger=merger)
+
+class BackgroundMerger:
+    """
+    Append finished PDFs to one PdfWriter on a worker thread while later pages
+    are still rendering, so the merge is mostly done when rendering ends.
+    Results may arrive in any order; they are buffered and appended in the
+    order of `expected`.
+    """
+
+    def __init__(self, expected: List[Path], output: Path):
+        self.expected = expected
+        self.output = output
+        self.sources_added = 0
+        self.error: Optional[BaseException] = None
+        self._write = True
+        self._q = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, path: Path, ok: bool = True):
+        self._q.put((path, ok))
+
+    def finish(self, write: bool = True) -> int:
+        """
+        Stop the worker and return how many source PDFs it took. Only writes
+        the merged PDF when write is True, so an aborted run doesn't clobber
+        a good earlier merge.
+        """
+        self._write = write
+        self._q.put(None)
+        self._thread.join()
+        if write and self.error is not None:
+            raise self.error
+        return self.sources_added
+
+    def _run(self):
+        writer = PdfWriter()
+        status = {}
+        nxt = 0
+        try:
+            while True:
+                item = self._q.get()
+                if item is None:
+                    break
+                status[item[0]] = item[1]
+                while nxt < len(self.expected) and self.expected[nxt] in status:
+                    p = self.expected[nxt]
+                    nxt += 1
+                    if status.pop(p):
+                        writer.append(str(p))
+                        self.sources_added += 1
+            if self._write and self.sources_added:
+                with open(self.output, "wb") as f:
+                    writer.write(f)
+        except BaseException as e:
+            self.error = e
 
 def compute_full_height_inches(driver, min_in=1.0, max_in=200.0, margin_in=0.4):
     # Chrome's printToPDF assumes ~96 CSS px per inch.
     # We’ll measure the full document height in CSS pixels and convert to inches.
-    scroll_height = driver.execute_script(
-        "return Math.max("
-        "document.body.scrollHeight, document.documentElement.scrollHeight,"
-        "document.body.offsetHeight, document.documentElement.offsetHeight,"
-        "document.body.clientHeight, document.documentElement.clientHeight);"
-    )
+    resp = driver.execute_cdp_cmd("Runtime.evaluate", {
+        "expression": "Math.max("
+                      "document.body.scrollHeight, document.documentElement.scrollHeight,"
+                      "document.body.offsetHeight, document.documentElement.offsetHeight,"
+                      "document.body.clientHeight, document.documentElement.clientHeight)",
+        "returnByValue": True,
+    })
+    scroll_height = resp.get("result", {}).get("value")
+    if "exceptionDetails" in resp or not isinstance(scroll_height, (int, float)):
+        # Surface JS errors like execute_script would, so render_one retries/skips the page
+        details = resp.get("exceptionDetails", {})
+        raise WebDriverException(f"height measurement failed: {details.get('text', resp)}")
     height_inches = (scroll_height / 96.0) + (margin_in * 2.0)
     return max(min_in, min(height_inches, max_in))
 
-def print_one_page_pdf(driver, url: str, out_path: Path, width_in=8.27, margin_in=0.4, wait_ms=1500):
-    driver.get(url)
-    # Let network & lazy content settle a bit
-    time.sleep(wait_ms / 1000.0)
+# Cheap fingerprint of how much has loaded/rendered so far
+SETTLE_JS = (
+    "return performance.getEntriesByType('resource').length + '|' +"
+    " document.body.innerText.length + '|' + document.body.innerHTML.length;"
+)
 
-    # Ensure "screen" media and full rendering
-    driver.execute_cdp_cmd("Emulation.setEmulatedMedia", {"media": "screen"})
+def wait_for_page_ready(driver, timeout_s: float):
+    """
+    Wait until document.readyState is 'complete' and the page has settled:
+    the resource count and body text/HTML sizes are unchanged across two
+    consecutive samples (taken 0.3s, 0.6s, 1.2s, ... apart, cap 3s), or
+    until timeout_s elapses. Static pages return quickly; busy ones still
+    get the full budget.
+    """
+    end = time.time() + timeout_s
+    try:
+        WebDriverWait(driver, timeout_s, poll_frequency=0.1).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+    except TimeoutException:
+        return
+
+    prev = driver.execute_script(SETTLE_JS)
+    stable = 0
+    interval = 0.3
+    while time.time() < end:
+        time.sleep(min(interval, max(0.0, end - time.time())))
+        interval = min(interval * 2, 3.0)
+        cur = driver.execute_script(SETTLE_JS)
+        stable = stable + 1 if cur == prev else 0
+        if stable >= 2:
+            return
+        prev = cur
 
-    # Calculate a tall single page height
-    paper_height_in = compute_full_height_inches(driver, margin_in=margin_in)
+def print_current_page_pdf(driver, out_path: Path, width_in=8.27, margin_in=0.4,
+                           paper_height_in: Optional[float] = None):
+    """Print whatever the driver is showing now; defaults to one tall page."""
+    if paper_height_in is None:
+        # Calculate a tall single page height
+        paper_height_in = compute_full_height_inches(driver, margin_in=margin_in)
 
     result = driver.execute_cdp_cmd("Page.printToPDF", {
         "printBackground": True,
@@ -67,25 +232,529 @@ def print_one_page_pdf(driver, url: str, out_path: Path, width_in=8.27, margin_i
         "marginLeft": margin_in,
         "marginRight": margin_in,
         "displayHeaderFooter": False,
+        "transferMode": "ReturnAsStream",
         # "scale": 1.0,  # Optional: tweak if you need to shrink content slightly
         # "pageRanges": "1",  # Not needed; we force one physical page via tall paper height
     })
-    pdf = base64.b64decode(result["data"])
-    out_path.write_bytes(pdf)
+    # Read the PDF back in chunks and write it straight to disk rather than
+    # receiving the whole document as one base64 string.
+    handle = result.get("stream")
+    if handle is None:
+        # Older Chrome ignores transferMode and inlines the PDF
+        with out_path.open("wb") as f:
+            f.write(base64.b64decode(result["data"], validate=False))
+        return
+    try:
+        with out_path.open("wb") as f:
+            while True:
+                chunk = driver.execute_cdp_cmd("IO.read", {"handle": handle, "size": 1 << 20})
+                data = chunk.get("data", "")
+                f.write(base64.b64decode(data) if chunk.get("base64Encoded") else data.encode("latin-1"))
+                if chunk.get("eof"):
+                    break
+    finally:
+        driver.execute_cdp_cmd("IO.close", {"handle": handle})
 
 def build_urls_from_range(base_url: str, start_from: int, start_to: int, step: int) -> List[str]:
     """Replace or inject 'start=' param across [start_from, start_to] inclusive."""
-    urls = []
     parsed = urlparse(base_url)
     q = parse_qs(parsed.query)
+    # Encode everything except 'start' once; only the start value changes per URL.
+    prefix = urlencode([(k, v[0]) for k, v in q.items() if k != "start"])
+    if prefix:
+        prefix += "&"
+    scheme, netloc, path, params, fragment = (
+        parsed.scheme, parsed.netloc, parsed.path, parsed.params, parsed.fragment)
+    return [urlunparse((scheme, netloc, path, params, f"{prefix}start={s}", fragment))
+            for s in range(start_from, start_to + 1, step)]
+
+# Common Scholar captcha container ids/classes (best-effort), checked in one round-trip
+CAPTCHA_JS = (
+    "return !!(document.getElementById('gs_captcha_ccl') ||"
+    " document.getElementById('recaptcha') ||"
+    " document.querySelector(\"form[action*='sorry']\"));"
+)
+
+class CaptchaTimeout(Exception):
+    """The user didn't solve a CAPTCHA within --captcha-timeout; give up on the URL."""
+
+def maybe_wait_for_captcha(driver, timeout_s: int) -> bool:
+    """
+    If Scholar shows a CAPTCHA, pause here and let the user solve it manually.
+    Returns True if we detected a captcha and it was cleared (so caller can
+    reload); raises CaptchaTimeout if it wasn't cleared in time.
+    """
+    try:
+        if driver.execute_script(CAPTCHA_JS):
+            print("⚠️ CAPTCHA detected. Please solve it in the visible browser window.")
+            # Poll for disappearance up to timeout, backing off 1s, 2s, 4s, ... (cap 15s)
+            end = time.time() + timeout_s
+            interval = 1.0
+            while time.time() < end:
+                time.sleep(min(interval, max(0.0, end - time.time())))
+                interval = min(interval * 2, 15.0)
+                if not driver.execute_script(CAPTCHA_JS):
+                    print("✅ CAPTCHA cleared. Resuming.")
+                    return True
+            print("⌛ CAPTCHA not cleared within timeout; skipping this page.")
+            raise CaptchaTimeout()
+    except CaptchaTimeout:
+        raise
+    except Exception:
+        pass
+    return False
+
+DRIVER_CACHE_DIR = Path.home() / ".cache" / "scholar_webpage"
+
+CHROME_BINARIES = [
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser",
+]
+
+def detect_chrome_version() -> str:
+    for binary in CHROME_BINARIES:
+        if not (os.path.exists(binary) or shutil.which(binary)):
+            continue
+        try:
+            out = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        m = re.search(r"\d+(?:\.\d+)+", out)
+        if m:
+            return m.group(0)
+    return "unknown"
+
+# One keep-alive session for every HTTP fetch this process makes, so repeated
+# requests to the same host reuse the TLS connection.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+class SessionHttpClient(WDMHttpClient):
+    """webdriver-manager HTTP client that goes through the shared SESSION."""
+
+    def get(self, url, **kwargs) -> requests.Response:
+        try:
+            resp = SESSION.get(url=url, verify=self._ssl_verify, stream=True, **kwargs)
+        except requests.exceptions.ConnectionError:
+            raise requests.exceptions.ConnectionError("Could not reach host. Are you offline?")
+        self.validate_response(resp)
+        return resp
+
+def resolve_driver_path(refresh: bool = False) -> str:
+    """
+    Return a chromedriver path, reusing the one resolved on a previous run for
+    the same Chrome version so webdriver-manager isn't hit on every start.
+    If the Chrome version can't be detected (e.g. Windows, non-PATH installs)
+    there is no safe cache key, so always ask webdriver-manager.
+    """
+    version = detect_chrome_version()
+    manager = ChromeDriverManager(download_manager=WDMDownloadManager(SessionHttpClient()))
+    if version == "unknown":
+        return manager.install()
+    cache_file = DRIVER_CACHE_DIR / f"driver_path_{SAFE.sub('_', version)}.txt"
+    if not refresh and cache_file.exists():
+        cached = cache_file.read_text().strip()
+        if cached and os.path.exists(cached):
+            return cached
+    path = manager.install()
+    DRIVER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(path)
+    return path
+
+def has_gpu() -> bool:
+    return sys.platform == "darwin" or shutil.which("nvidia-smi") is not None
+
+def in_container() -> bool:
+    return (os.path.exists("/.dockerenv") or os.path.exists("/run/.containerenv")
+            or getattr(os, "geteuid", lambda: -1)() == 0)
+
+USER_AGENT = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+              "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36")
+
+BLOCKED_URLS = ["*google-analytics*", "*googletagmanager*", "*doubleclick*",
+                "*.woff2", "*.woff", "*gstatic*/fonts*"]
+BLOCKED_IMAGE_URLS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp"]
+
+def make_driver(args, user_data_dir: Optional[str] = None, driver_path: Optional[str] = None,
+                cache_dir: Optional[str] = None, use_gpu: Optional[bool] = None):
+    if use_gpu is None:
+        use_gpu = not args.no_gpu and has_gpu()
+    chrome_options = Options()
+    if not args.headful:
+        chrome_options.add_argument("--headless=new")
+    if user_data_dir:
+        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+    if cache_dir:
+        # Persistent HTTP cache so Scholar's shared JS/CSS is a cache hit after the first page/run
+        chrome_options.add_argument(f"--disk-cache-dir={cache_dir}")
+        chrome_options.add_argument("--disk-cache-size=536870912")
+    features = ["NetworkServiceInProcess"]
+    # Don't advertise the session as automated
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    if use_gpu:
+        # New headless rasterizes on the GPU fine; let it take paint off the CPU.
+        # Linux keeps Chrome's default ANGLE backend.
+        features.append("UseSkiaRenderer")
+        chrome_options.add_argument("--enable-gpu-rasterization")
+        if sys.platform == "darwin":
+            chrome_options.add_argument("--use-gl=angle")
+            chrome_options.add_argument("--use-angle=metal")
+    else:
+        chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument(f"--enable-features={','.join(features)}")
+    if in_container():
+        # Chrome's sandbox can't start as root / inside most containers
+        chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1280,2000")  # large viewport to reduce reflow surprises
+    chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+    service = Service(executable_path=driver_path or resolve_driver_path())
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except WebDriverException as e:
+        if not use_gpu:
+            raise
+        print(f"  ! Chrome failed to start with GPU flags ({e.msg}); retrying with --disable-gpu.")
+        return make_driver(args, user_data_dir, driver_path, cache_dir, use_gpu=False)
+
+    # Don't fetch things that never show up in the printed PDF
+    blocked = BLOCKED_URLS + (BLOCKED_IMAGE_URLS if args.block_images else [])
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+    driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+    # Ensure "screen" media for printing; the override sticks across navigations
+    driver.execute_cdp_cmd("Emulation.setEmulatedMedia", {"media": "screen"})
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"
+    })
+    return driver
+
+def already_rendered(out_path: Path) -> bool:
+    """True if out_path holds a readable PDF from an earlier run."""
+    try:
+        if not out_path.exists() or out_path.stat().st_size <= 1024:
+            return False
+        PdfReader(str(out_path)).pages[0]
+        return True
+    except Exception:
+        return False
+
+def render_one(driver, url: str, out_path: Path, args, width: float,
+               stop: Optional[threading.Event] = None) -> bool:
+    """Navigate, handle CAPTCHA and print one URL with retries. Returns True on success."""
+    stop = stop or threading.Event()
+    # Simple backoff retries
+    attempts, backoff = 0, 3
+    while attempts < 3 and not stop.is_set():
+        attempts += 1
+        try:
+            driver.get(url)
+            # If CAPTCHA appears, pause and let you solve it
+            if args.headful and maybe_wait_for_captcha(driver, args.captcha_timeout):
+                # After captcha solved, reload page to ensure content
+                driver.get(url)
+
+            # Let things settle (network idle + lazy images)
+            wait_for_page_ready(driver, args.wait_ms * 3 / 1000.0)
+
+            # Never save the CAPTCHA/"sorry" page: already_rendered() would keep it forever
+            if driver.execute_script(CAPTCHA_JS):
+                raise WebDriverException("still on a CAPTCHA page; not printing")
+
+            # Now print single-page PDF (already navigated and waited)
+            print_current_page_pdf(driver, out_path, width_in=width, margin_in=args.margin)
+            return True
+        except CaptchaTimeout:
+            # Retrying would just sit through another full --captcha-timeout
+            return False
+        except WebDriverException as e:
+            print(f"  ! [{out_path.name}] Attempt {attempts} failed: {e}. Backing off {backoff}s.")
+            stop.wait(backoff)
+            backoff *= 2  # exponential backoff
+    return False
 
-    for s in range(start_from, start_to + 1, step):
-        q_mod = dict(q)
-        q_mod["start"] = [str(s)]
-        new_query = urlencode({k: v[0] if isinstance(v, list) else v for k, v in q_mod.items()})
-        new_url = urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, new_query, parsed.fragment))
-        urls.append(new_url)
-    return urls
+def render_with_selenium(jobs: List[Job], total: int, out_dir: Path, args, width: float,
+                         on_done: Optional[OnDone] = None) -> List[Path]:
+    # Set up one Chrome per worker. Profiles and caches live under out_dir so
+    # they survive across runs; Chrome locks its profile dir, so each worker
+    # gets its own and only the first one reuses --user-data-dir.
+    concurrency = max(1, args.concurrency)
+    driver_path = resolve_driver_path(refresh=args.refresh_driver)
+    drivers = []
+    idle = queue.Queue()
+    pdf_paths = []
+
+    # Cooldown is global: while one worker rests, the others wait on this lock
+    # before their next navigation.
+    pace_lock = threading.Lock()
+    done_count = [0]
+    # Set on Ctrl-C / error so queued and sleeping jobs bail out instead of navigating
+    stop = threading.Event()
+
+    def job(i: int, url: str, out_path: Path) -> Optional[Path]:
+        if stop.is_set():
+            return None
+        print(f"[{i}/{total}] Printing → {out_path.name}")
+
+        # Random human-ish delay before each navigation
+        if stop.wait(random.uniform(args.min_wait, args.max_wait)):
+            return None
+        with pace_lock:
+            pass
+        if stop.is_set():
+            return None
+
+        driver = idle.get()
+        try:
+            ok = render_one(driver, url, out_path, args, width, stop)
+        finally:
+            idle.put(driver)
+        if on_done:
+            on_done(out_path, ok)
+
+        # Cooldown after bursts
+        with pace_lock:
+            done_count[0] += 1
+            n = done_count[0]
+            if n % args.rest_every == 0 and n < len(jobs):
+                print(f"🛑 Cooling down for {args.cooldown_sec}s to be polite to Scholar.")
+                stop.wait(args.cooldown_sec)
+        return out_path if ok else None
+
+    try:
+        for w in range(concurrency):
+            suffix = f"_{w}" if w else ""
+            if w == 0 and args.user_data_dir:
+                profile = args.user_data_dir
+            else:
+                profile = str(out_dir / f".chrome_profile{suffix}")
+            cache_dir = str(out_dir / f".chrome_cache{suffix}")
+            drivers.append(make_driver(args, profile, driver_path, cache_dir))
+            idle.put(drivers[-1])
+
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            futures = [pool.submit(job, *j) for j in jobs]
+            for fut in futures:
+                out_path = fut.result()
+                if out_path is not None:
+                    pdf_paths.append(out_path)
+        except BaseException:
+            # Don't let queued URLs keep navigating before the error surfaces
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+    finally:
+        for d in drivers:
+            d.quit()
+    return pdf_paths
+
+def render_single_iframe(urls: List[str], out_dir: Path, args, width: float, merged_path: Path) -> bool:
+    """
+    Load every URL as an iframe of one local wrapper page and print that once,
+    skipping the per-URL PDFs and the merge. Returns False (nothing written)
+    if any frame refuses to load, e.g. because of X-Frame-Options.
+
+    The first URL is probed on its own first, so a site that refuses framing
+    (Scholar does) costs one request rather than an unpaced burst of N.
+    """
+    wrapper = out_dir / "wrapper.html"
+
+    def load_wrapper(driver, frame_urls: List[str]) -> Optional[List[int]]:
+        """Load frame_urls as iframes and size each one; None if any frame is refused."""
+        frames = "\n".join(
+            f'<div class="pg"><iframe src="{html.escape(u, quote=True)}"></iframe></div>' for u in frame_urls
+        )
+        wrapper.write_text(
+            "<!doctype html><html><head><meta charset='utf-8'><style>"
+            "body{margin:0} .pg{break-after:page} iframe{width:100%;border:0;display:block}"
+            f"</style></head><body>\n{frames}\n</body></html>"
+        )
+        driver.get(wrapper.resolve().as_uri())
+        wait_for_page_ready(driver, args.wait_ms * 3 / 1000.0)
+
+        # Size each iframe to its content. Cross-origin frames can't be read
+        # from the parent, so step into each one.
+        heights = []
+        for el in driver.find_elements(By.TAG_NAME, "iframe"):
+            driver.switch_to.frame(el)
+            try:
+                WebDriverWait(driver, args.wait_ms * 3 / 1000.0, poll_frequency=0.1).until(
+                    lambda d: d.execute_script("return document.readyState") == "complete"
+                )
+                if driver.execute_script("return location.href").startswith("chrome-error:"):
+                    return None
+                h = driver.execute_script(
+                    "return Math.max(document.body.scrollHeight, document.documentElement.scrollHeight);"
+                )
+            except TimeoutException:
+                return None
+            finally:
+                driver.switch_to.default_content()
+            driver.execute_script("arguments[0].style.height = arguments[1] + 'px';", el, h)
+            heights.append(h)
+        return heights
+
+    profile = args.user_data_dir or str(out_dir / ".chrome_profile")
+    driver = None
+    try:
+        driver = make_driver(args, profile, resolve_driver_path(refresh=args.refresh_driver),
+                             str(out_dir / ".chrome_cache"))
+        heights = load_wrapper(driver, urls[:1])
+        if heights is None:
+            return False
+        if len(urls) > 1:
+            heights = load_wrapper(driver, urls)
+            if heights is None:
+                return False
+
+        # printToPDF needs one paper size, so every frame gets a page as tall as the tallest
+        paper_height_in = max(1.0, min(max(heights) / 96.0 + args.margin * 2.0, 200.0))
+        print_current_page_pdf(driver, merged_path, width_in=width, margin_in=args.margin,
+                               paper_height_in=paper_height_in)
+        return True
+    except WebDriverException as e:
+        print(f"  ! single-iframe render failed: {e}")
+        return False
+    finally:
+        if driver is not None:
+            driver.quit()
+        wrapper.unlink(missing_ok=True)
+
+async def render_with_playwright(jobs: List[Job], total: int, out_dir: Path, args, width: float,
+                                 on_done: Optional[OnDone] = None) -> List[Path]:
+    """
+    Same job as render_with_selenium, but Playwright talks CDP over one
+    persistent WebSocket instead of an HTTP round-trip per command.
+    """
+    # optional: pip install playwright
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+    pace_lock = asyncio.Lock()
+    done_count = [0]
+    blocked = BLOCKED_URLS + (BLOCKED_IMAGE_URLS if args.block_images else [])
+
+    captcha_fn = f"() => {{ {CAPTCHA_JS} }}"
+
+    async def goto(page, url: str):
+        # A load timeout or navigation error propagates and gets retried, so a
+        # page that never committed (still about:blank) is never printed.
+        await page.goto(url, wait_until="load", timeout=max(args.wait_ms, 1000) * 10)
+        try:
+            await page.wait_for_load_state("networkidle", timeout=args.wait_ms * 3)
+        except PlaywrightTimeoutError:
+            # Chatty pages may never go idle; print what we have
+            pass
+        await settle(page)
+
+    async def settle(page):
+        """Async twin of wait_for_page_ready's settle loop."""
+        settle_fn = f"() => {{ {SETTLE_JS} }}"
+        end = time.time() + args.wait_ms * 3 / 1000.0
+        prev = await page.evaluate(settle_fn)
+        stable = 0
+        interval = 0.3
+        while time.time() < end:
+            await asyncio.sleep(min(interval, max(0.0, end - time.time())))
+            interval = min(interval * 2, 3.0)
+            cur = await page.evaluate(settle_fn)
+            stable = stable + 1 if cur == prev else 0
+            if stable >= 2:
+                return
+            prev = cur
+
+    async def wait_for_captcha(page) -> bool:
+        """Playwright twin of maybe_wait_for_captcha (headful hand-off)."""
+        if not await page.evaluate(captcha_fn):
+            return False
+        print("⚠️ CAPTCHA detected. Please solve it in the visible browser window.")
+        end = time.time() + args.captcha_timeout
+        interval = 1.0
+        while time.time() < end:
+            await asyncio.sleep(min(interval, max(0.0, end - time.time())))
+            interval = min(interval * 2, 15.0)
+            if not await page.evaluate(captcha_fn):
+                print("✅ CAPTCHA cleared. Resuming.")
+                return True
+        print("⌛ CAPTCHA not cleared within timeout; skipping this page.")
+        raise CaptchaTimeout()
+
+    async with async_playwright() as p:
+        # Persistent profile + disk cache under out_dir, like the Selenium engine;
+        # --user-data-dir reuses an existing profile (cookies, login) instead.
+        profile = args.user_data_dir or str(out_dir / ".playwright_profile")
+        cache_dir = out_dir / ".playwright_cache"
+        ctx = await p.chromium.launch_persistent_context(
+            profile,
+            headless=not args.headful,
+            ignore_default_args=["--enable-automation"],
+            args=[f"--disk-cache-dir={cache_dir}", "--disk-cache-size=536870912"],
+            user_agent=USER_AGENT,
+            viewport={"width": 1280, "height": 2000},
+        )
+        await ctx.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined});")
+
+        async def job(i: int, url: str, out_path: Path) -> Optional[Path]:
+            async with sem:
+                print(f"[{i}/{total}] Printing → {out_path.name}")
+                await asyncio.sleep(random.uniform(args.min_wait, args.max_wait))
+                async with pace_lock:
+                    pass
+                ok = False
+                attempts, backoff = 0, 3
+                while attempts < 3 and not ok:
+                    attempts += 1
+                    page = await ctx.new_page()
+                    try:
+                        cdp = await ctx.new_cdp_session(page)
+                        await cdp.send("Network.enable")
+                        await cdp.send("Network.setBlockedURLs", {"urls": blocked})
+                        await page.emulate_media(media="screen")
+                        await goto(page, url)
+                        # If CAPTCHA appears, pause and let you solve it, then reload
+                        if args.headful and await wait_for_captcha(page):
+                            await goto(page, url)
+                        if await page.evaluate(captcha_fn):
+                            raise RuntimeError("still on a CAPTCHA page; not printing")
+                        scroll_height = await page.evaluate(
+                            "Math.max(document.body.scrollHeight, document.documentElement.scrollHeight,"
+                            "document.body.offsetHeight, document.documentElement.offsetHeight,"
+                            "document.body.clientHeight, document.documentElement.clientHeight)"
+                        )
+                        height = max(1.0, min(scroll_height / 96.0 + args.margin * 2.0, 200.0))
+                        margin = f"{args.margin}in"
+                        await page.pdf(path=str(out_path), width=f"{width}in", height=f"{height}in",
+                                       print_background=True,
+                                       margin={"top": margin, "bottom": margin, "left": margin, "right": margin})
+                        ok = True
+                    except CaptchaTimeout:
+                        break
+                    except Exception as e:
+                        print(f"  ! [{out_path.name}] Attempt {attempts} failed: {e}. Backing off {backoff}s.")
+                        await asyncio.sleep(backoff)
+                        backoff *= 2
+                    finally:
+                        await page.close()
+            if on_done:
+                on_done(out_path, ok)
+
+            async with pace_lock:
+                done_count[0] += 1
+                n = done_count[0]
+                if n % args.rest_every == 0 and n < len(jobs):
+                    print(f"🛑 Cooling down for {args.cooldown_sec}s to be polite to Scholar.")
+                    await asyncio.sleep(args.cooldown_sec)
+            return out_path if ok else None
+
+        try:
+            results = await asyncio.gather(*(job(*j) for j in jobs))
+        finally:
+            await ctx.close()
+    return [r for r in results if r is not None]
 
 def read_urls_from_file(path: Path) -> List[str]:
     out = []
@@ -105,10 +774,29 @@ def main():
     ap.add_argument("--step", type=int, default=10, help="Step for 'start=' when using --base-url.")
     ap.add_argument("--out-dir", type=str, default="pdf_pages", help="Directory for individual PDFs.")
     ap.add_argument("--merged", type=str, default="merged.pdf", help="Output merged PDF path.")
+    ap.add_argument("--merger", choices=["auto", "pikepdf", "pypdf", "pdftk"], default="auto",
+                    help="Backend used to merge the per-page PDFs (auto: pikepdf if installed, else pypdf).")
+    ap.add_argument("--merge-chunk", type=int, default=32,
+                    help="Merge at most this many PDFs at a time, then merge the intermediates.")
+    ap.add_argument("--force", action="store_true",
+                    help="Re-render pages even if their PDF already exists in --out-dir.")
+    ap.add_argument("--merge-strategy", choices=["render-each", "single-iframe"], default="render-each",
+                    help="single-iframe prints all URLs as iframes of one page (no merge step, no "
+                         "pacing/cooldown/skip-list); probes the first URL and falls back to render-each "
+                         "if the site refuses framing, as Scholar usually does.")
+    ap.add_argument("--overlap-merge", action="store_true",
+                    help="Merge each PDF (with pypdf) as soon as it is rendered, overlapping the merge "
+                         "with rendering. Ignores --merger/--merge-chunk.")
     ap.add_argument("--letter", action="store_true", help="Use Letter width (8.5in) instead of A4 (8.27in).")
     ap.add_argument("--margin", type=float, default=0.4, help="Margins in inches on all sides.")
-    ap.add_argument("--wait-ms", type=int, default=1500, help="Extra wait after load before printing.")
+    ap.add_argument("--wait-ms", type=int, default=1500, help="Wait budget for the page to settle before printing (up to 3x this on busy pages).")
+    ap.add_argument("--block-images", action="store_true",
+                    help="Also skip loading images (smaller, faster PDFs for text-only pages).")
+    ap.add_argument("--no-gpu", action="store_true",
+                    help="Always pass --disable-gpu (use if GPU detection misfires).")
     ap.add_argument("--headful", action="store_true", help="Run Chrome with UI (debugging).")
+    ap.add_argument("--refresh-driver", action="store_true",
+                    help="Re-resolve chromedriver via webdriver-manager instead of using the cached path.")
     ap.add_argument("--user-data-dir", type=str,
                 help="Path to a Chrome user data dir to reuse (keeps cookies, login, etc.).")
     ap.add_argument("--rest-every", type=int, default=10,
@@ -119,6 +807,10 @@ def main():
                     help="Minimum random wait between pages (seconds).")
     ap.add_argument("--max-wait", type=float, default=5.0,
                     help="Maximum random wait between pages (seconds).")
+    ap.add_argument("--engine", choices=["selenium", "playwright"], default="selenium",
+                    help="Browser driver. playwright needs: pip install playwright && playwright install chromium")
+    ap.add_argument("--concurrency", type=int, default=1,
+                    help="Number of Chrome instances rendering pages in parallel.")
     ap.add_argument("--captcha-timeout", type=int, default=600,
                     help="Max seconds to wait for you to manually solve a CAPTCHA in headful mode.")
     args = ap.parse_args()
@@ -135,104 +827,58 @@ def main():
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # Set up Chrome
-    chrome_options = Options()
-    if not args.headful:
-        chrome_options.add_argument("--headless=new")
-    if args.user_data_dir:
-        chrome_options.add_argument(f"--user-data-dir={args.user_data_dir}")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1280,2000")  # large viewport to reduce reflow surprises
-    chrome_options.add_argument(
-        "--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-    )
-    driver = webdriver.Chrome(ChromeDriverManager().install(), options=chrome_options)
+    # Work out every output path up front; pages finished by an earlier run
+    # are reused as-is unless --force.
+    jobs = [(i, url, out_dir / f"{i:03d}_{safe_name(url)}.pdf") for i, url in enumerate(urls, 1)]
+    order = {p: i for i, _, p in jobs}
+    done = [] if args.force else [p for _, _, p in jobs if already_rendered(p)]
+    if done:
+        print(f"Skipping {len(done)} page(s) already rendered in {out_dir}")
+        done_set = set(done)
+        jobs = [j for j in jobs if j[2] not in done_set]
 
-    def maybe_wait_for_captcha(driver, timeout_s: int) -> bool:
-        """
-        If Scholar shows a CAPTCHA, pause here and let the user solve it manually.
-        Returns True if we detected a captcha and waited (so caller can retry printing).
-        """
-        try:
-            # Common Scholar captcha container ids/classes (best-effort)
-            captcha_present = driver.find_elements(By.ID, "gs_captcha_ccl") or \
-                            driver.find_elements(By.ID, "recaptcha") or \
-                            driver.find_elements(By.CSS_SELECTOR, "form[action*='sorry']")
-
-            if captcha_present:
-                print("⚠️ CAPTCHA detected. Please solve it in the visible browser window.")
-                # Poll for disappearance up to timeout
-                end = time.time() + timeout_s
-                while time.time() < end:
-                    time.sleep(3)
-                    still_there = driver.find_elements(By.ID, "gs_captcha_ccl") or \
-                                driver.find_elements(By.ID, "recaptcha") or \
-                                driver.find_elements(By.CSS_SELECTOR, "form[action*='sorry']")
-                    if not still_there:
-                        print("✅ CAPTCHA cleared. Resuming.")
-                        return True
-                print("⌛ CAPTCHA not cleared within timeout; continuing anyway.")
-                return True
-        except Exception:
-            pass
-        return False
-    pdf_paths = []
     width = 8.5 if args.letter else 8.27
+    merged_path = Path(args.merged)
+    if args.merge_strategy == "single-iframe":
+        if args.engine != "selenium":
+            print("single-iframe strategy needs --engine selenium; rendering each page instead.")
+        elif render_single_iframe(urls, out_dir, args, width, merged_path):
+            print(f"Done. Merged PDF → {merged_path.resolve()}")
+            return
+        else:
+            print("Some pages refused to load in an iframe; rendering each page instead.")
 
-    try:
-        for i, url in enumerate(urls, 1):
-            name = f"{i:03d}_{safe_name(url)}.pdf"
-            out_path = out_dir / name
-            print(f"[{i}/{len(urls)}] Printing → {out_path.name}")
-
-            # Random human-ish delay before each navigation
-            delay = random.uniform(args.min_wait, args.max_wait)
-            time.sleep(delay)
-
-            # Simple backoff retries
-            attempts, backoff = 0, 3
-            while attempts < 3:
-                attempts += 1
-                try:
-                    driver.get(url)
-                    # If CAPTCHA appears, pause and let you solve it
-                    if args.headful and maybe_wait_for_captcha(driver, args.captcha_timeout):
-                        # After captcha solved, reload page to ensure content
-                        driver.get(url)
-
-                    # Let things settle (network idle + lazy images)
-                    time.sleep(max(1.0, args.wait_ms / 1000.0))
-
-                    # Now print single-page PDF
-                    print_one_page_pdf(
-                        driver, url, out_path,
-                        width_in=width,
-                        margin_in=args.margin,
-                        wait_ms=0  # already waited
-                    )
-                    pdf_paths.append(out_path)
-                    break  # success
-                except WebDriverException as e:
-                    print(f"  ! Attempt {attempts} failed: {e}. Backing off {backoff}s.")
-                    time.sleep(backoff)
-                    backoff *= 2  # exponential backoff
-
-            # Cooldown after bursts
-            if i % args.rest_every == 0 and i < len(urls):
-                print(f"🛑 Cooling down for {args.cooldown_sec}s to be polite to Scholar.")
-                time.sleep(args.cooldown_sec)
+    merger = None
+    on_done = None
+    if args.overlap_merge:
+        # Merge pages in the background as they finish instead of after the loop
+        merger = BackgroundMerger(list(order), merged_path)
+        for p in done:
+            merger.add(p)
+        on_done = merger.add
 
-    finally:
-        driver.quit()
+    try:
+        if not jobs:
+            pdf_paths = []
+        elif args.engine == "playwright":
+            pdf_paths = asyncio.run(render_with_playwright(jobs, len(urls), out_dir, args, width, on_done))
+        else:
+            pdf_paths = render_with_selenium(jobs, len(urls), out_dir, args, width, on_done)
+    except BaseException:
+        if merger:
+            merger.finish(write=False)
+        raise
+    merged_count = merger.finish() if merger else 0
+    # Merge in URL order regardless of completion order (or >999 pages)
+    pdf_paths = sorted(done + pdf_paths, key=order.__getitem__)
     if not pdf_paths:
         print("No PDFs were created; nothing to merge.", file=sys.stderr)
         sys.exit(2)
 
-    merged_path = Path(args.merged)
-    merge_pdfs(pdf_paths, merged_path)
+    if merger is None:
+        merge_tree(pdf_paths, merged_path, k=args.merge_chunk, merger=args.merger)
+    elif merged_count != len(pdf_paths):
+        print(f"  ! background merge took {merged_count} of {len(pdf_paths)} PDFs", file=sys.stderr)
     print(f"Done. Merged PDF → {merged_path.resolve()}")
     print(f"Individual PDFs in → {out_dir.resolve()}")
 